@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+SQLite Connection Pool
+Reuses configured connections to the home automation database so callers
+don't pay connection and PRAGMA setup on every query.
+"""
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from queue import Queue, Empty
+
+class SQLiteConnectionPool:
+    """Fixed-size pool of SQLite connections, created lazily on demand
+
+    With read_only=True connections are opened with mode=ro and only
+    per-connection PRAGMAs are applied, so the database file is never changed.
+    """
+
+    def __init__(self, db_path, size=4, read_only=False):
+        self.db_path = str(db_path)
+        self.size = size
+        self.read_only = read_only
+        self._queue = Queue(maxsize=size)
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def connect(self):
+        """Open a new connection with the runtime PRAGMAs applied once"""
+        # Connections may be handed to any thread that borrows them
+        if self.read_only:
+            uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            # journal_mode is persisted in the file, so only set it on writers
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA cache_size = -65536")  # 64 MiB
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
+
+    def get_connection(self, timeout=None):
+        """Borrow a connection, opening a new one while below the pool size"""
+        try:
+            return self._queue.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                create = True
+            else:
+                create = False
+
+        if create:
+            try:
+                return self.connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._created -= 1
+                raise
+
+        return self._queue.get(timeout=timeout)
+
+    def return_connection(self, conn):
+        """Hand a borrowed connection back to the pool"""
+        if conn.in_transaction:
+            conn.rollback()
+        self._queue.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.get_connection()
+        try:
+            yield conn
+        finally:
+            self.return_connection(conn)
+
+    def close_all(self):
+        """Close every idle connection held by the pool"""
+        while True:
+            try:
+                conn = self._queue.get_nowait()
+            except Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_pool(db_path, size=4, read_only=False):
+    """Return the shared pool for a database path, creating it on first use"""
+    key = (str(db_path), read_only)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = SQLiteConnectionPool(str(db_path), size, read_only)
+        return _pools[key]
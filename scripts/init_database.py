@@ -4,127 +4,202 @@ Home Automation Database Initialization Script
 Creates SQLite database with JSON support for storing device and automation data
 """
 
+import argparse
 import sqlite3
 import os
 import json
 from pathlib import Path
 
-def init_database(db_path):
-    """Initialize the SQLite database with required tables"""
+# STORED generated columns need SQLite 3.31+; older runtimes skip them
+HAS_GENERATED_COLUMNS = sqlite3.sqlite_version_info >= (3, 31, 0)
+if HAS_GENERATED_COLUMNS:
+    GENERATED_COLUMNS_SQL = """
+    -- Hot JSON fields materialized so filters don't parse device_data per row
+    model TEXT GENERATED ALWAYS AS (json_extract(device_data, '$.model')) STORED,
+    firmware TEXT GENERATED ALWAYS AS (json_extract(device_data, '$.firmware_version')) STORED,"""
+else:
+    GENERATED_COLUMNS_SQL = ""
+
+# SQLite 3.45+ can store device_data in its binary JSONB encoding, which
+# json_extract() reads without reparsing; older runtimes keep plain JSON text.
+# Other clients of a JSONB database also need SQLite 3.45+ (see data/README.md)
+HAS_JSONB = sqlite3.sqlite_version_info >= (3, 45, 0)
+JSON_COLUMN_TYPE = "BLOB" if HAS_JSONB else "JSON"
+JSON_PARAM = "jsonb(?)" if HAS_JSONB else "?"
+
+SCHEMA_SQL = f"""
+-- Devices
+CREATE TABLE IF NOT EXISTS devices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    device_id TEXT UNIQUE NOT NULL,
+    device_type TEXT NOT NULL,
+    ip_address TEXT,
+    hostname TEXT,
+    mac_address TEXT,
+    device_data {JSON_COLUMN_TYPE},{GENERATED_COLUMNS_SQL}
+    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Events (logging)
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_type TEXT NOT NULL,
+    device_id TEXT,
+    event_data JSON,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Configuration
+CREATE TABLE IF NOT EXISTS configuration (
+    key TEXT PRIMARY KEY,
+    value JSON,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Indexes for common lookups (recent events, per-device history, device type)
+CREATE INDEX IF NOT EXISTS idx_events_ts ON events(timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_events_device ON events(device_id, timestamp DESC);
+CREATE INDEX IF NOT EXISTS idx_devices_type ON devices(device_type);
+"""
 
-    # Ensure data directory exists
-    db_dir = os.path.dirname(db_path)
-    os.makedirs(db_dir, exist_ok=True)
-
-    # Connect to database
-    conn = sqlite3.connect(db_path)
-    conn.execute("PRAGMA foreign_keys = ON")
-    conn.execute("PRAGMA journal_mode = WAL")  # Better concurrency
-
-    # Create devices table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS devices (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            device_id TEXT UNIQUE NOT NULL,
-            device_type TEXT NOT NULL,
-            ip_address TEXT,
-            hostname TEXT,
-            mac_address TEXT,
-            device_data JSON,
-            last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Create events table for logging
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            event_type TEXT NOT NULL,
-            device_id TEXT,
-            event_data JSON,
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Create configuration table
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS configuration (
-            key TEXT PRIMARY KEY,
-            value JSON,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Insert some default configuration
-    default_config = {
-        "network": {
-            "subnet": "192.168.1.0/24",
-            "gateway": "192.168.1.1",
-            "dns_servers": ["8.8.8.8", "1.1.1.1"]
-        },
-        "automation": {
-            "enabled": True,
-            "log_level": "info",
-            "backup_interval_hours": 24
-        }
-    }
+# Databases created before the generated columns existed (or on SQLite < 3.31)
+# lack devices.model
+MODEL_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_devices_model ON devices(model)"
+
+INSERT_DEVICE_SQL = f"""
+    INSERT OR IGNORE INTO devices
+    (device_id, device_type, ip_address, hostname, device_data)
+    VALUES (?, ?, ?, ?, {JSON_PARAM})
+"""
 
-    conn.execute("""
-        INSERT OR IGNORE INTO configuration (key, value)
-        VALUES (?, ?)
-    """, ("system_config", json.dumps(default_config)))
-
-    # Insert sample device data
-    sample_devices = [
-        {
-            "device_id": "openwrt_router",
-            "device_type": "router",
-            "ip_address": "192.168.1.1",
-            "hostname": "openwrt",
-            "device_data": {
-                "model": "OpenWRT One",
-                "firmware_version": "23.05.0",
-                "wifi_enabled": True,
-                "lan_ports": 3,
-                "wan_ports": 1
-            }
-        },
-        {
-            "device_id": "macpro_server",
-            "device_type": "server",
-            "ip_address": "192.168.1.214",
-            "hostname": "macpro",
-            "device_data": {
-                "os": "Debian Linux",
-                "services": ["jellyfin", "mongodb", "deduplication"],
-                "storage_tb": 11
-            }
+DEFAULT_CONFIG = {
+    "network": {
+        "subnet": "192.168.1.0/24",
+        "gateway": "192.168.1.1",
+        "dns_servers": ["8.8.8.8", "1.1.1.1"]
+    },
+    "automation": {
+        "enabled": True,
+        "log_level": "info",
+        "backup_interval_hours": 24
+    }
+}
+
+SAMPLE_DEVICES = [
+    {
+        "device_id": "openwrt_router",
+        "device_type": "router",
+        "ip_address": "192.168.1.1",
+        "hostname": "openwrt",
+        "device_data": {
+            "model": "OpenWRT One",
+            "firmware_version": "23.05.0",
+            "wifi_enabled": True,
+            "lan_ports": 3,
+            "wan_ports": 1
+        }
+    },
+    {
+        "device_id": "macpro_server",
+        "device_type": "server",
+        "ip_address": "192.168.1.214",
+        "hostname": "macpro",
+        "device_data": {
+            "os": "Debian Linux",
+            "services": ["jellyfin", "mongodb", "deduplication"],
+            "storage_tb": 11
         }
-    ]
-
-    for device in sample_devices:
-        conn.execute("""
-            INSERT OR IGNORE INTO devices
-            (device_id, device_type, ip_address, hostname, device_data)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
-            device["device_id"],
-            device["device_type"],
-            device["ip_address"],
-            device["hostname"],
-            json.dumps(device["device_data"])
-        ))
-
-    conn.commit()
-    conn.close()
+    }
+]
+
+# Serialized once at import; init_database() only binds parameters
+_DEFAULT_CONFIG_JSON = json.dumps(DEFAULT_CONFIG)
+_SAMPLE_DEVICE_ROWS = [
+    (
+        device["device_id"],
+        device["device_type"],
+        device["ip_address"],
+        device["hostname"],
+        json.dumps(device["device_data"])
+    )
+    for device in SAMPLE_DEVICES
+]
+
+def init_database(db_path, fast=False):
+    """Initialize the SQLite database with required tables
+
+    With fast=True, fsyncs are skipped while the schema is built (the script
+    can simply be rerun if interrupted) and WAL mode is enabled afterwards.
+    """
+
+    # Ensure data directory exists (a bare filename needs no directory)
+    db_dir = os.path.dirname(db_path)
+    if db_dir and not os.path.isdir(db_dir):
+        os.makedirs(db_dir, exist_ok=True)
+
+    # Connect in autocommit mode; the only transaction is the explicit BEGIN below
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    cur = conn.cursor()  # reused for every statement below
+
+    # page_size only applies to a fresh database, so set it before any table
+    # exists (and before switching to WAL, which locks the page size in)
+    cur.execute("PRAGMA page_size = 8192")
+    cur.execute("PRAGMA cache_size = -65536")  # 64 MiB
+    cur.execute("PRAGMA temp_store = MEMORY")
+    cur.execute("PRAGMA mmap_size = 268435456")  # 256 MiB
+    cur.execute("PRAGMA foreign_keys = ON")
+    if fast:
+        cur.execute("PRAGMA synchronous = OFF")
+        cur.execute("PRAGMA journal_mode = MEMORY")
+    else:
+        cur.execute("PRAGMA journal_mode = WAL")  # Better concurrency
+
+    # Run all DDL and seed statements in one transaction (single fsync)
+    try:
+        # executescript() commits any pending transaction before running,
+        # so the transaction is opened inside the script itself
+        cur.executescript("BEGIN IMMEDIATE;\n" + SCHEMA_SQL)
+
+        if HAS_GENERATED_COLUMNS:
+            device_columns = {row[1] for row in cur.execute("PRAGMA table_xinfo(devices)")}
+            if "model" in device_columns:
+                cur.execute(MODEL_INDEX_SQL)
+
+        # Insert some default configuration
+        cur.execute("""
+            INSERT OR IGNORE INTO configuration (key, value)
+            VALUES (?, ?)
+        """, ("system_config", _DEFAULT_CONFIG_JSON))
+
+        # Insert sample device data
+        cur.executemany(INSERT_DEVICE_SQL, _SAMPLE_DEVICE_ROWS)
+
+        cur.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            cur.execute("ROLLBACK")
+        raise
+    else:
+        if fast:
+            # journal_mode cannot change inside a transaction, so restore after COMMIT
+            cur.execute("PRAGMA journal_mode = WAL")
+            cur.execute("PRAGMA synchronous = NORMAL")
+    finally:
+        cur.close()
+        conn.close()
 
     print(f"✅ Database initialized successfully at: {db_path}")
     print("📊 Created tables: devices, events, configuration")
     print("📝 Inserted sample data and default configuration")
 
 def main():
+    parser = argparse.ArgumentParser(description="Initialize the home automation SQLite database")
+    parser.add_argument("--fast-init", action="store_true",
+                        help="skip fsyncs during setup (rerun if interrupted)")
+    args = parser.parse_args()
+
     # Get database path from environment or use default
     db_path = os.getenv('SQLITE_DB_PATH', 'data/home_automation.db')
 
@@ -133,11 +208,13 @@ def main():
         db_path = os.path.join(os.getcwd(), db_path)
 
     try:
-        init_database(db_path)
+        init_database(db_path, fast=args.fast_init)
         print(f"\n🔍 Database file location: {db_path}")
         print("💡 You can explore the data with: sqlite3 data/home_automation.db")
+        if HAS_JSONB:
+            print("   (device_data is stored as JSONB; the sqlite3 CLI must be 3.45 or newer)")
         print("   Example queries:")
-        print("   - SELECT * FROM devices;")
+        print("   - SELECT device_id, json(device_data) FROM devices;")
         print("   - SELECT key, value FROM configuration;")
         print("   - SELECT * FROM events ORDER BY timestamp DESC LIMIT 10;")
 
@@ -4,116 +4,152 @@ MCP Home Automation Setup Verification Script
 Tests that all components are properly configured and working.
 """
 
+import os
 import sys
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
 from pathlib import Path
 
+try:
+    from .db_pool import get_pool
+except ImportError:
+    # Run directly as a script, with scripts/ on sys.path
+    from db_pool import get_pool
+
+DB_PATH = Path("data/home_automation.db")
+
+# (pip distribution name, importable module name)
+REQUIRED_PACKAGES = (
+    ('requests', 'requests'),
+    ('python-dotenv', 'dotenv'),
+    ('sqlalchemy', 'sqlalchemy'),
+    ('pypdf', 'pypdf'),
+)
+
+def _dir_entries(path, cache):
+    """Return the regular files in a directory, scanning each directory only once"""
+    if path not in cache:
+        try:
+            with os.scandir(path) as it:
+                # is_file() follows symlinks, so broken links and directories are excluded
+                cache[path] = {entry.name for entry in it if entry.is_file()}
+        except OSError:
+            cache[path] = set()
+    return cache[path]
+
 def check_virtual_env():
     """Check if running in virtual environment"""
-    print("🔍 Checking Python virtual environment...")
+    log = ["🔍 Checking Python virtual environment..."]
     if hasattr(sys, 'real_prefix') or (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix):
-        print("✅ Running in virtual environment")
-        return True
+        log.append("✅ Running in virtual environment")
+        return True, log
     else:
-        print("❌ Not running in virtual environment")
-        return False
+        log.append("❌ Not running in virtual environment")
+        return False, log
 
 def check_dependencies():
     """Check if required Python packages are installed"""
-    print("\n🔍 Checking Python dependencies...")
-    required_packages = ['requests', 'dotenv', 'sqlalchemy', 'pypdf']
+    log = ["\n🔍 Checking Python dependencies..."]
     missing = []
 
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-            print(f"✅ {package}")
-        except ImportError:
-            print(f"❌ {package}")
+    for package, module in REQUIRED_PACKAGES:
+        # Only locate the package; importing it would run its module code
+        if find_spec(module) is not None:
+            log.append(f"✅ {package}")
+        else:
+            log.append(f"❌ {package}")
             missing.append(package)
 
-    return len(missing) == 0
+    return len(missing) == 0, log
 
 def check_database():
     """Check if database is properly initialized"""
-    print("\n🔍 Checking database setup...")
-    db_path = Path("data/home_automation.db")
+    log = ["\n🔍 Checking database setup..."]
 
-    if not db_path.exists():
-        print("❌ Database file not found")
-        return False
+    if not DB_PATH.exists():
+        log.append("❌ Database file not found")
+        return False, log
 
-    try:
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
+    required_tables = ('devices', 'events', 'configuration')
 
-        # Check if tables exist
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        tables = cursor.fetchall()
-        table_names = [table[0] for table in tables]
+    try:
+        # Read-only so verification never changes the database it checks
+        with get_pool(DB_PATH, read_only=True).connection() as conn:
+            # Check if tables exist, filtering in SQLite rather than Python
+            table_names = {
+                row[0] for row in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type='table' AND name IN (?, ?, ?)",
+                    required_tables
+                )
+            }
 
-        required_tables = ['devices', 'events', 'configuration']
         missing_tables = [t for t in required_tables if t not in table_names]
 
         if missing_tables:
-            print(f"❌ Missing tables: {missing_tables}")
-            conn.close()
-            return False
+            log.append(f"❌ Missing tables: {missing_tables}")
+            return False, log
 
-        print("✅ Database tables exist")
-        conn.close()
-        return True
+        log.append("✅ Database tables exist")
+        return True, log
 
     except sqlite3.Error as e:
-        print(f"❌ Database error: {e}")
-        return False
+        log.append(f"❌ Database error: {e}")
+        return False, log
 
 def check_env_file():
     """Check if .env file exists and has required variables"""
-    print("\n🔍 Checking environment configuration...")
+    log = ["\n🔍 Checking environment configuration..."]
     env_path = Path(".env")
 
-    if not env_path.exists():
-        print("❌ .env file not found")
-        return False
+    try:
+        with open(env_path, 'r', encoding='utf-8') as f:
+            # Parse variable names in one pass; comments and blank lines are skipped
+            keys = set()
+            for line in f:
+                line = line.strip()
+                if '=' not in line or line.startswith('#'):
+                    continue
+                if line.startswith('export '):
+                    line = line[len('export '):]
+                keys.add(line.split('=', 1)[0].strip())
+    except FileNotFoundError:
+        log.append("❌ .env file not found")
+        return False, log
 
     required_vars = ['PYTHON_EXECUTABLE', 'PYTHONPATH']
-    missing_vars = []
-
-    with open(env_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    for var in required_vars:
-        if var not in content:
-            missing_vars.append(var)
+    missing_vars = [var for var in required_vars if var not in keys]
 
     if missing_vars:
-        print(f"❌ Missing environment variables: {missing_vars}")
-        return False
+        log.append(f"❌ Missing environment variables: {missing_vars}")
+        return False, log
 
-    print("✅ Environment configuration found")
-    return True
+    log.append("✅ Environment configuration found")
+    return True, log
 
 def check_node_servers():
     """Check if Node.js MCP servers can be found"""
-    print("\n🔍 Checking MCP server files...")
+    log = ["\n🔍 Checking MCP server files..."]
     servers = [
         "ansible-mcp-server/index.mjs",
         "ansible-ssh-decider/index.mjs",
         "documents-mcp-server/index.mjs"
     ]
 
+    listings = {}
     missing = []
     for server in servers:
-        if not Path(server).exists():
+        path = Path(server)
+        # Fall back to a direct stat so case-insensitive filesystems still match
+        if path.name not in _dir_entries(str(path.parent), listings) and not path.is_file():
             missing.append(server)
 
     if missing:
-        print(f"❌ Missing server files: {missing}")
-        return False
+        log.append(f"❌ Missing server files: {missing}")
+        return False, log
 
-    print("✅ All MCP server files found")
-    return True
+    log.append("✅ All MCP server files found")
+    return True, log
 
 def main():
     """Run all verification checks"""
@@ -128,11 +164,22 @@ def main():
         check_node_servers
     ]
 
+    # Checks are independent and mostly I/O bound, so run them concurrently
+    # and print their output afterwards in a stable order
+    try:
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            # Each check returns (passed, output_lines)
+            results = list(executor.map(lambda check: check(), checks))
+    finally:
+        get_pool(DB_PATH, read_only=True).close_all()
+
     passed = 0
     total = len(checks)
 
-    for check in checks:
-        if check():
+    for ok, log in results:
+        for line in log:
+            print(line)
+        if ok:
             passed += 1
 
     print("\n" + "=" * 50)